@@ -2,9 +2,13 @@
 import streamlit as st
 import pandas as pd
 import pickle
+import os
 from sklearn.metrics.pairwise import cosine_similarity
 from streamlit_option_menu import option_menu
 import urllib.parse
+from title_index import build_title_index
+from catalog import COMPACT_CATALOG, load_catalog, compact_catalog, memory_report
+from model import history_query, top_n_similar
 
 # ========================
 # 👑 App Configuration
@@ -149,13 +153,21 @@ def load_model():
         similarity_matrix = pickle.load(f)
     return vectorizer, similarity_matrix
 
-@st.cache_data
-def load_books():
-    return pd.read_csv("book_profiles.csv")
-
-@st.cache_data
-def load_metadata():
-    return pd.read_csv("books.csv")
+# One table for books, metadata and genres, plus the TF-IDF matrix of their profiles
+# Shared across reruns and sessions; in compact mode the profile text is dropped once vectorized
+@st.cache_resource
+def load_catalog_data(_vectorizer, compact=COMPACT_CATALOG):
+    catalog = load_catalog(compact=compact)
+    catalog["genres"] = catalog["profile"].apply(infer_genre_from_profile)
+    tfidf_matrix = _vectorizer.transform(catalog['profile'])
+    if compact:
+        catalog = compact_catalog(catalog)
+    return catalog, tfidf_matrix
+
+# Built once per catalog and shared across reruns and sessions
+@st.cache_resource
+def load_title_index(_catalog):
+    return build_title_index(_catalog, popularity_col='ratings_count', top_k=25)
 
 # ========================
 # 📚 Genre Inference
@@ -182,18 +194,20 @@ def infer_genre_from_profile(profile):
 # ========================
 # 🔄 Load and Merge
 # ========================
-vectorizer, similarity_matrix = load_model()
-books = load_books()
-metadata = load_metadata()
+if not os.path.exists("model.pkl"):
+    st.error("🧙‍♀️ 'model.pkl' is missing — out-of-core training removes it because it belongs to the old vectorizer. Run `python model.py` to rebuild it. ✨")
+    st.stop()
 
-# Merge profiles with metadata
-metadata = pd.merge(metadata, books[['book_id', 'profile']], on='book_id', how='left')
+vectorizer, similarity_matrix = load_model()
 
-# Apply genre inference
-metadata["genres"] = metadata["profile"].apply(infer_genre_from_profile)
+# Merged catalog with inferred genres, and the TF-IDF matrix for similarity comparisons
+catalog, tfidf_matrix = load_catalog_data(vectorizer)
 
-# Create TF-IDF matrix for similarity comparisons
-tfidf_matrix = vectorizer.transform(books['profile'])
+# The similarity matrix is indexed by catalog row, so it must have been built from the same catalog
+if similarity_matrix.shape[0] != len(catalog):
+    st.error(f"🧙‍♀️ 'model.pkl' covers {similarity_matrix.shape[0]} books but the catalog has {len(catalog)}. Run `python model.py` to rebuild it. ✨")
+    st.stop()
+title_index = load_title_index(catalog)
 
 
 # ========================
@@ -202,7 +216,7 @@ tfidf_matrix = vectorizer.transform(books['profile'])
 
 def get_book_details(title):
     # Capitalize and clean title and author for search query
-    row = metadata[metadata['title'].str.lower() == title.lower()].iloc[0]
+    row = catalog[catalog['title'].str.lower() == title.lower()].iloc[0]
     clean_title = row['title'].strip().title()
     clean_author = row.get('authors', '').strip().title()
 
@@ -232,19 +246,37 @@ def show_book_card(title, author, image_url, percent_liked, link=None):
             st.markdown(f"<a href='{link}' target='_blank'><button style='background-color:#e6b3ff;color:black;padding:5px 10px;border:none;border-radius:8px;'>🛙️ Buy Now</button></a>", unsafe_allow_html=True)
 
 def recommend_by_book(title, top_n=5):
-    if title not in books['title'].values:
+    if title not in catalog['title'].values:
         return None
-    idx = books[books['title'] == title].index[0]
+    idx = catalog[catalog['title'] == title].index[0]
     sim_scores = list(enumerate(similarity_matrix[idx]))
     sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
     top_indices = [i for i, score in sim_scores[1:top_n+1]]
-    return books.iloc[top_indices]
+    return catalog.iloc[top_indices]
 
 def recommend_by_interests(user_input, top_n=5):
     input_vec = vectorizer.transform([user_input])
     sims = cosine_similarity(input_vec, tfidf_matrix).flatten()
     top_indices = sims.argsort()[::-1][1:top_n+1]
-    return books.iloc[top_indices]
+    return catalog.iloc[top_indices]
+
+def recommend_by_history(titles, ratings=None, top_n=5):
+    # Combine the liked books (optionally weighted by rating) into one query and score the catalog once
+    if ratings is not None and len(ratings) != len(titles):
+        raise ValueError(f"Got {len(ratings)} ratings for {len(titles)} titles")
+    in_history = catalog['title'].isin(titles)
+    matches = catalog.loc[in_history, 'title'].drop_duplicates()
+    title_rows = dict(zip(matches, matches.index))
+    ratings = [1.0] * len(titles) if ratings is None else ratings
+    known = [(title_rows[title], r) for title, r in zip(titles, ratings) if title in title_rows]
+    if not known:
+        return None
+    rows = [row for row, _ in known]
+    weights = [r for _, r in known]
+    query = history_query(tfidf_matrix, rows, weights)
+    # Leave out every row sharing a title with the history, not just the seed rows
+    top_indices, _ = top_n_similar(query, tfidf_matrix, top_n, exclude=[catalog.index[in_history]])[0]
+    return catalog.iloc[top_indices]
 
 # ========================
 # 📚 Navigation Menu
@@ -338,12 +370,17 @@ if section == "Select a Book":
         </script>
     """, unsafe_allow_html=True)
 
-    title_list = books['title'].dropna().unique()
+    # Server-side typeahead: only the most popular titles matching the prefix are sent to the browser
+    title_prefix = st.text_input("Start typing a book title:", key="book_prefix")
+    title_list = title_index.search(title_prefix)
 
     with st.form("book_form"):
-        selected_title = st.selectbox("Choose a book you like:", sorted(title_list), key="book_select")
-        submitted = st.form_submit_button("🔍 Recommend Books")
-        if submitted:
+        if not title_list:
+            st.info("📚 No titles start with that — try fewer letters!")
+        selected_title = st.selectbox("Choose a book you like:", title_list, key="book_select")
+        submitted = st.form_submit_button("🔍 Recommend Books", disabled=not title_list)
+        add_to_history = st.form_submit_button("➕ Add to My Reading History", disabled=not title_list)
+        if submitted and selected_title:
             results = recommend_by_book(selected_title)
             if results is not None and not results.empty:
                 st.subheader(f"📘 Because you liked *{selected_title}*:")
@@ -362,6 +399,37 @@ if section == "Select a Book":
                     section = "Enter Interests"
                     st.experimental_rerun()
 
+    # 📚 Reading history: several liked books combined into one recommendation
+    history = st.session_state.setdefault("reading_history", [])
+    if add_to_history and selected_title and selected_title not in history:
+        history.append(selected_title)
+
+    if history:
+        st.markdown("📚 **My Reading History:** " + ", ".join(f"*{title}*" for title in history))
+        col1, col2 = st.columns(2)
+        with col1:
+            recommend_history = st.button("🔮 Recommend from My History")
+        with col2:
+            if st.button("🧹 Clear History"):
+                history.clear()
+                st.rerun()
+
+        if recommend_history:
+            results = recommend_by_history(history)
+            if results is not None and not results.empty:
+                st.subheader("📘 Because of your reading history:")
+                for _, row in results.iterrows():
+                    details = get_book_details(row['title'])
+                    show_book_card(
+                        row['title'],
+                        row['authors'],
+                        details['image_url'],
+                        get_percent_liked(details['average_rating']),
+                        link=details.get("buy_link", "#")
+                    )
+            else:
+                st.warning("🧘‍♀️ Oopsie-daisy! Our crystal ball found no matches for your reading history. Add a few more books you love and try again! 💫")
+
 # ========================
 # 🧠 Interest-Based Recommender
 # ========================
@@ -410,7 +478,7 @@ elif section == "Enter Interests":
 # ========================
 elif section == "Explore All Books":
     st.title("📚 Browse All Books in BookTeria")
-    for _, row in metadata.iterrows():
+    for _, row in catalog.iterrows():
         genre = row.get('genres', 'Unknown')
         details = get_book_details(row['title'])
         show_book_card(row['title'], row['authors'], row['image_url'], get_percent_liked(row['average_rating']), link=details.get("buy_link", "#"))
@@ -438,6 +506,17 @@ elif section == "Explore Data":
     st.image("outputs/top_tags.png", caption="🍿 Most Popular Tags by Readers", use_container_width=True)
     st.image("outputs/tags_per_book_dist.png", caption="📚 How Many Tags Each Book Gets", use_container_width=True)
 
+    with st.expander("🧮 Memory Budget"):
+        st.caption(f"Compact catalog mode is {'on' if COMPACT_CATALOG else 'off'}.")
+        st.dataframe(memory_report({
+            "catalog": catalog,
+            "tfidf_matrix": tfidf_matrix,
+            "similarity_matrix": similarity_matrix,
+            "title_index": title_index,
+            "vectorizer.vocabulary_": vectorizer.vocabulary_,
+            "vectorizer.idf_": vectorizer.idf_,
+        }), hide_index=True)
+
 # ========================
 # 📦 Buy Now
 # ========================
@@ -469,7 +548,7 @@ elif section == "Buy Now":
 
         submitted = st.form_submit_button("🔍 Search for Purchase")
         if submitted and search_title:
-            match = metadata[metadata['title'].str.lower().str.contains(search_title.strip().lower(), na=False)]
+            match = catalog[catalog['title'].str.lower().str.contains(search_title.strip().lower(), na=False)]
             if not match.empty:
                 row = match.iloc[0]
                 buy_link = get_book_details(row['title'])['buy_link']
@@ -485,7 +564,7 @@ elif section == "Buy Now":
                 """, unsafe_allow_html=True)
             else:
                 st.warning("👑 Alas! This book is not yet in our royal library. Please try another title!")
-                suggestions = metadata[metadata['title'].str.lower().str.contains(search_title.strip().lower().split()[0], na=False)].head(3)
+                suggestions = catalog[catalog['title'].str.lower().str.contains(search_title.strip().lower().split()[0], na=False)].head(3)
                 if not suggestions.empty:
                     st.markdown("🔍 Perhaps you meant:")
                     for _, row in suggestions.iterrows():
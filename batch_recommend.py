@@ -0,0 +1,160 @@
+# batch_recommend.py — Batch Recommendations as JSONL
+# ===========================
+# This script reads one query per line (a book title or a free-text interest
+# string) from a file or stdin, and writes one JSON object per query with its
+# top recommendations. Artifacts are loaded once per worker process, queries are
+# scored in vectorized chunks across a process pool, and results are streamed
+# in input order with only a bounded number of chunks in flight.
+#
+# Example:
+#   python batch_recommend.py cohort.txt --top-n 10 --workers 4 > recs.jsonl
+#   cat titles.txt | python batch_recommend.py --mode title
+
+import argparse
+import json
+import os
+import pickle
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import pandas as pd
+from scipy.sparse import vstack
+
+from model import TFIDF_STORE, load_tfidf_matrix, top_n_similar
+
+# Artifacts loaded once per process by load_artifacts()
+_artifacts = {}
+
+# Load the vectorizer, TF-IDF rows and book list into this process
+def load_artifacts(store=TFIDF_STORE):
+    with open("vectorizer.pkl", "rb") as f:
+        vectorizer = pickle.load(f)
+    books = pd.read_csv("book_profiles.csv", usecols=['book_id', 'title', 'authors'])
+
+    # First occurrence wins, matching model.recommend_books
+    title_rows = {}
+    for i, title in enumerate(books['title']):
+        title_rows.setdefault(title, i)
+
+    # Plain lists: per-item DataFrame lookups dominate the cost of building results
+    _artifacts.update(
+        vectorizer=vectorizer,
+        tfidf_matrix=load_tfidf_matrix(vectorizer, store),
+        book_ids=books['book_id'].astype(int).tolist(),
+        titles=books['title'].fillna('').tolist(),
+        authors=books['authors'].fillna('').tolist(),
+        title_rows=title_rows,
+    )
+
+# Recommend books for a chunk of queries
+# - mode 'title': the query must be an exact title; the book itself is excluded
+# - mode 'interests': the query is vectorized as free text
+# - mode 'auto': exact titles are treated as titles, everything else as interests
+# Returns a list of JSON-ready dicts in the same order as `queries`
+def recommend_chunk(queries, mode='auto', top_n=5):
+    vectorizer = _artifacts['vectorizer']
+    tfidf_matrix = _artifacts['tfidf_matrix']
+    book_ids, titles, authors = _artifacts['book_ids'], _artifacts['titles'], _artifacts['authors']
+    title_rows = _artifacts['title_rows']
+
+    kinds, seeds = [], []
+    for query in queries:
+        row = title_rows.get(query) if mode != 'interests' else None
+        kinds.append('title' if row is not None else 'interests')
+        seeds.append(row)
+
+    # In title mode, lines that are not titles are reported without being scored
+    scored = [i for i, kind in enumerate(kinds) if mode != 'title' or kind == 'title']
+
+    # Titles reuse their stored TF-IDF rows; interests are vectorized in one call
+    matches = {}
+    if scored:
+        interest_queries = [queries[i] for i in scored if kinds[i] == 'interests']
+        interest_rows = iter(vectorizer.transform(interest_queries)) if interest_queries else iter(())
+        query_rows = vstack([
+            tfidf_matrix[seeds[i]] if kinds[i] == 'title' else next(interest_rows)
+            for i in scored
+        ]).tocsr()
+        exclude = [[seeds[i]] if seeds[i] is not None else [] for i in scored]
+        matches = dict(zip(scored, top_n_similar(query_rows, tfidf_matrix, top_n, exclude)))
+
+    results = []
+    for i, (query, kind) in enumerate(zip(queries, kinds)):
+        if i not in matches:
+            results.append({"query": query, "mode": "title", "error": "title not found", "recommendations": []})
+            continue
+        indices, scores = matches[i]
+        recommendations = [
+            {
+                "book_id": book_ids[row],
+                "title": titles[row],
+                "authors": authors[row],
+                "score": round(float(score), 6),
+            }
+            for row, score in zip(indices, scores)
+        ]
+        results.append({"query": query, "mode": kind, "recommendations": recommendations})
+    return results
+
+# Yield non-empty, stripped input lines in lists of `chunksize`
+def iter_chunks(lines, chunksize):
+    queries = (line.strip() for line in lines)
+    queries = (query for query in queries if query)
+    while True:
+        chunk = list(islice(queries, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+# Score all chunks and yield their results in input order
+# At most `workers * 2` chunks are queued at once, so memory stays bounded
+def run_batch(lines, mode='auto', top_n=5, chunksize=256, workers=None, store=TFIDF_STORE):
+    workers = workers or os.cpu_count() or 1
+    chunks = iter_chunks(lines, chunksize)
+
+    if workers == 1:
+        load_artifacts(store)
+        for chunk in chunks:
+            yield from recommend_chunk(chunk, mode, top_n)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_artifacts, initargs=(store,)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(recommend_chunk, chunk, mode, top_n))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+# Entry point: stream JSONL recommendations to stdout or --output
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recommend books for many titles or interest strings at once.")
+    parser.add_argument("input", nargs="?", default="-", help="file with one query per line (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("--mode", choices=["auto", "title", "interests"], default="auto", help="how to interpret each line")
+    parser.add_argument("--top-n", type=int, default=5, help="recommendations per query")
+    parser.add_argument("--chunksize", type=int, default=256, help="queries scored together in one vectorized call")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--store", default=TFIDF_STORE, help="on-disk TF-IDF store from 'python model.py --out-of-core'")
+    args = parser.parse_args(argv)
+    for name in ("top_n", "chunksize", "workers"):
+        value = getattr(args, name)
+        if value is not None and value < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for result in run_batch(source, args.mode, args.top_n, args.chunksize, args.workers, args.store):
+            sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# catalog.py — Build the In-Memory Book Catalog
+# ===========================
+# This module merges books.csv and book_profiles.csv into a single table that
+# the app uses for recommendations, browsing and purchase links. In compact
+# mode it keeps only the columns the app reads, stores repeated strings as
+# categoricals and narrows numerics to 32 bits.
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Compact mode is on by default; set BOOKTERIA_COMPACT_CATALOG=0 to keep every column
+COMPACT_CATALOG = os.environ.get("BOOKTERIA_COMPACT_CATALOG", "1") != "0"
+
+# Columns of books.csv that the app actually reads
+CATALOG_COLUMNS = ['book_id', 'title', 'authors', 'language_code',
+                   'average_rating', 'ratings_count', 'image_url']
+
+# Low-cardinality text columns that repeat across many books
+CATEGORY_COLUMNS = ['authors', 'language_code', 'genres']
+
+# Load books and profiles into one table
+# - Rows follow book_profiles.csv order so row i matches row i of the TF-IDF matrix
+# - Title and author come from books.csv only, so they are not stored twice
+def load_catalog(compact=COMPACT_CATALOG):
+    profiles = pd.read_csv("book_profiles.csv", usecols=['book_id', 'profile'])
+    books = pd.read_csv("books.csv", usecols=CATALOG_COLUMNS if compact else None)
+    return profiles.merge(books, on='book_id', how='left')
+
+# Shrink a catalog once the profile text has been vectorized
+# - Drops 'profile' (the TF-IDF matrix already holds its content)
+# - Converts repeated strings to categoricals
+# - Narrows float64/int64 columns to float32/int32 where the values fit
+def compact_catalog(catalog):
+    catalog = catalog.drop(columns=['profile'], errors='ignore')
+
+    for col in CATEGORY_COLUMNS:
+        if col in catalog:
+            catalog[col] = catalog[col].astype('category')
+
+    for col in catalog.select_dtypes(include='float64').columns:
+        catalog[col] = catalog[col].astype(np.float32)
+
+    int32 = np.iinfo(np.int32)
+    for col in catalog.select_dtypes(include='int64').columns:
+        if catalog[col].between(int32.min, int32.max).all():
+            catalog[col] = catalog[col].astype(np.int32)
+
+    return catalog
+
+# Estimate the memory held by one structure, in bytes
+# - DataFrames count their string contents (deep=True)
+# - Sparse matrices count their data, index and pointer arrays
+# - Objects with an nbytes() method (e.g. TitleIndex) report themselves
+# - Dicts count their keys and values
+def structure_nbytes(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if hasattr(obj, 'indptr'):
+        return int(obj.data.nbytes + obj.indices.nbytes + obj.indptr.nbytes)
+    if callable(getattr(obj, 'nbytes', None)):
+        return int(obj.nbytes())
+    if hasattr(obj, 'nbytes'):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in obj.items())
+    if hasattr(obj, '__len__') and not isinstance(obj, (str, bytes)):
+        return sys.getsizeof(obj) + sum(sys.getsizeof(item) for item in obj)
+    return sys.getsizeof(obj)
+
+# Build a memory budget report: one row per named structure plus a total
+# Returns a DataFrame: { structure, megabytes }
+def memory_report(structures):
+    rows = [(name, structure_nbytes(obj) / 1024 ** 2) for name, obj in structures.items()]
+    report = pd.DataFrame(rows, columns=['structure', 'megabytes'])
+    total = pd.DataFrame([('total', report['megabytes'].sum())], columns=report.columns)
+    return pd.concat([report, total], ignore_index=True).round(2)
+
+# Compare the full and compact catalogs when run directly
+if __name__ == "__main__":
+    full = load_catalog(compact=False)
+    compact = compact_catalog(load_catalog(compact=True))
+    print(memory_report({"full catalog": full, "compact catalog": compact}).to_string(index=False))
@@ -2,17 +2,36 @@
 # ===========================
 # This script loads book_profiles.csv, vectorizes the content using TF-IDF,
 # computes cosine similarity, and saves both the vectorizer and similarity matrix.
+# For catalogs that don't fit in RAM, --out-of-core streams the profiles in
+# chunks and writes the TF-IDF rows to an on-disk sparse store instead.
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from collections import Counter
 
 import pandas as pd
 import numpy as np
 import pickle
+from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+# Directory holding the TF-IDF rows written by the out-of-core trainer
+TFIDF_STORE = "tfidf_store"
+
 # Load the book profiles generated from preprocess.py
 def load_profiles():
     return pd.read_csv("book_profiles.csv")
 
+# Stream the 'profile' column of book_profiles.csv in chunks of `chunksize` rows
+def iter_profiles(chunksize):
+    for chunk in pd.read_csv("book_profiles.csv", usecols=['profile'], chunksize=chunksize):
+        yield chunk['profile'].fillna('')
+
 # Build and train TF-IDF(Term Frequency – Inverse Document Frequency) 
 # Similarity matrix(Cosine Similarity -> Measures the angle between two TF-IDF vectors. The smaller the angle, the more similar the content.)
 def train_model():
@@ -28,6 +47,8 @@ def train_model():
     similarity_matrix = cosine_similarity(tfidf_matrix)
 
     # Step 4: Save the model and vectorizer using pickle
+    # Any out-of-core TF-IDF store was built with the previous vectorizer, so remove it
+    shutil.rmtree(TFIDF_STORE, ignore_errors=True)
     with open("model.pkl", "wb") as f:
         pickle.dump(similarity_matrix, f)
 
@@ -37,6 +58,169 @@ def train_model():
     print("✅ Model and vectorizer saved as 'model.pkl' and 'vectorizer.pkl'")
     return df, similarity_matrix
 
+# Fit the TF-IDF vectorizer without holding the whole catalog in memory
+# - Pass 1 streams the profiles and counts, per term, how many books contain it
+# - Vocabulary and IDF weights are then derived exactly as TfidfVectorizer.fit does
+#   (sorted terms, smooth idf), so transform() gives the same rows as the in-memory path
+# Memory grows with the vocabulary size, not with the number of books
+def fit_vectorizer_out_of_core(chunksize=5000):
+    analyzer = TfidfVectorizer(stop_words='english').build_analyzer()
+    doc_freq = Counter()
+    n_docs = 0
+    for profiles in iter_profiles(chunksize):
+        for profile in profiles:
+            doc_freq.update(set(analyzer(profile)))
+        n_docs += len(profiles)
+
+    terms = sorted(doc_freq)
+    vocabulary = {term: i for i, term in enumerate(terms)}
+    df = np.array([doc_freq[term] for term in terms], dtype=np.float64)
+
+    vectorizer = TfidfVectorizer(stop_words='english', vocabulary=vocabulary)
+    vectorizer.idf_ = np.log((1 + n_docs) / (1 + df)) + 1
+    return vectorizer
+
+# Pass 2: transform the profiles chunk by chunk and append the CSR rows to disk
+# The store is three flat binary files (data, indices, indptr) plus meta.json
+# It is built in '<path>.tmp' and only moved into place once complete, so a run
+# that dies midway never leaves truncated files behind a valid meta.json
+def write_tfidf_store(vectorizer, chunksize=5000, path=TFIDF_STORE):
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    n_rows, nnz = 0, 0
+
+    with open(os.path.join(tmp_path, "data.bin"), "wb") as data_f, \
+         open(os.path.join(tmp_path, "indices.bin"), "wb") as indices_f, \
+         open(os.path.join(tmp_path, "indptr.bin"), "wb") as indptr_f:
+        np.zeros(1, dtype=np.int64).tofile(indptr_f)
+        for profiles in iter_profiles(chunksize):
+            rows = vectorizer.transform(profiles)
+            rows.data.astype(np.float64).tofile(data_f)
+            rows.indices.astype(np.int32).tofile(indices_f)
+            (rows.indptr[1:].astype(np.int64) + nnz).tofile(indptr_f)
+            n_rows += rows.shape[0]
+            nnz += rows.nnz
+
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({
+            "shape": [n_rows, len(vectorizer.vocabulary_)],
+            "nnz": nnz,
+            "vectorizer": vectorizer_fingerprint(vectorizer),
+        }, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return n_rows, nnz
+
+# Hash of the vocabulary (in column order) and IDF weights of a fitted vectorizer
+# Stored in meta.json so a store is only used with the vectorizer that wrote it
+def vectorizer_fingerprint(vectorizer):
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    digest = hashlib.sha256("\n".join(terms).encode("utf-8"))
+    digest.update(np.asarray(vectorizer.idf_, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+# Check whether the store at `path` was written with `vectorizer`
+def store_matches_vectorizer(vectorizer, path=TFIDF_STORE):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    return (meta["shape"][1] == len(vectorizer.vocabulary_)
+            and meta.get("vectorizer") == vectorizer_fingerprint(vectorizer))
+
+# Open the on-disk TF-IDF store as a CSR matrix backed by memory-mapped files
+# Row i is the L2-normalized TF-IDF vector of row i in book_profiles.csv
+def load_tfidf_store(path=TFIDF_STORE):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    n_rows, n_features = meta["shape"]
+    data = np.memmap(os.path.join(path, "data.bin"), dtype=np.float64, mode="r", shape=(meta["nnz"],))
+    indices = np.memmap(os.path.join(path, "indices.bin"), dtype=np.int32, mode="r", shape=(meta["nnz"],))
+    indptr = np.memmap(os.path.join(path, "indptr.bin"), dtype=np.int64, mode="r", shape=(n_rows + 1,))
+    return csr_matrix((data, indices, indptr), shape=(n_rows, n_features), copy=False)
+
+# Load the TF-IDF rows of the whole catalog
+# Uses the on-disk store when it exists and matches `vectorizer`, otherwise
+# vectorizes book_profiles.csv in memory
+def load_tfidf_matrix(vectorizer, path=TFIDF_STORE):
+    if os.path.exists(os.path.join(path, "meta.json")):
+        if store_matches_vectorizer(vectorizer, path):
+            return load_tfidf_store(path)
+        print(f"⚠️ '{path}/' was built with a different vectorizer; re-run 'python model.py --out-of-core'. "
+              "Vectorizing profiles in memory instead.", file=sys.stderr)
+    return vectorizer.transform(load_profiles()['profile'].fillna(''))
+
+# Score every book against each query row and keep the `top_n` best per query
+# - query_rows: sparse matrix of L2-normalized TF-IDF rows, one per query
+# - exclude: optional list (one entry per query) of row indices to leave out
+# Dot products of normalized rows are cosine similarities. The catalog stays on
+# the left of the product so scipy reads its CSR rows in place (memory-mapped
+# when loaded from the store) and only converts the small query block.
+# Returns a list of (indices, scores) pairs, best first
+def top_n_similar(query_rows, tfidf_matrix, top_n=5, exclude=None):
+    if top_n < 1:
+        raise ValueError(f"top_n must be at least 1, got {top_n}")
+    scores = (tfidf_matrix @ query_rows.T).T.tocsr()
+    results = []
+    for q in range(scores.shape[0]):
+        start, end = scores.indptr[q], scores.indptr[q + 1]
+        indices, values = scores.indices[start:end], scores.data[start:end]
+
+        if exclude is not None and len(exclude[q]):
+            keep = ~np.isin(indices, exclude[q])
+            indices, values = indices[keep], values[keep]
+
+        if len(indices) > top_n:
+            best = np.argpartition(-values, top_n)[:top_n]
+            indices, values = indices[best], values[best]
+
+        order = np.lexsort((indices, -values))
+        results.append((indices[order], values[order]))
+    return results
+
+# Combine several liked books into one query row
+# - seed_rows: row indices of the liked books
+# - weights: optional weight per book (e.g. the reader's star rating); equal by default,
+#   and every weight must be positive
+# Builds a 1 x N sparse selector so the weighted sum of the seed rows is a single
+# sparse product, then re-normalizes it so scores stay cosine similarities
+def history_query(tfidf_matrix, seed_rows, weights=None):
+    seed_rows = np.asarray(seed_rows, dtype=np.int64)
+    weights = np.ones(len(seed_rows)) if weights is None else np.asarray(weights, dtype=np.float64)
+    if np.any(weights <= 0):
+        raise ValueError("History weights must be positive (e.g. star ratings from 1 to 5)")
+    selector = csr_matrix((weights, (np.zeros(len(seed_rows), dtype=np.int64), seed_rows)),
+                          shape=(1, tfidf_matrix.shape[0]))
+    query = (selector @ tfidf_matrix).tocsr()
+    norm = np.sqrt(query.multiply(query).sum())
+    return query / norm if norm > 0 else query
+
+# Out-of-core training: bounded memory regardless of catalog size
+# Skips the dense similarity matrix (N x N does not scale); similarities are
+# computed on demand from the stored TF-IDF rows instead
+def train_model_out_of_core(chunksize=5000, path=TFIDF_STORE):
+    vectorizer = fit_vectorizer_out_of_core(chunksize)
+    n_rows, nnz = write_tfidf_store(vectorizer, chunksize, path)
+
+    # model.pkl was computed with the previous vectorizer and catalog, so remove it
+    if os.path.exists("model.pkl"):
+        os.remove("model.pkl")
+        print("🧹 Removed 'model.pkl' (built with the previous vectorizer); run 'python model.py' to rebuild it")
+
+    with open("vectorizer.pkl", "wb") as f:
+        pickle.dump(vectorizer, f)
+
+    print(f"✅ Vectorizer saved as 'vectorizer.pkl' and {n_rows} TF-IDF rows ({nnz} non-zeros) saved to '{path}/'")
+    return vectorizer
+
+# Check the out-of-core store against an in-memory fit_transform (needs the catalog to fit in RAM)
+def verify_tfidf_store(path=TFIDF_STORE):
+    expected = TfidfVectorizer(stop_words='english').fit_transform(load_profiles()['profile'].fillna(''))
+    stored = load_tfidf_store(path)
+    if expected.shape != stored.shape:
+        return False
+    return abs(expected - stored).max() < 1e-12
+
 # Function to recommend similar books given a title
 def recommend_books(book_title, top_n=5):
     df = load_profiles()
@@ -59,6 +243,50 @@ def recommend_books(book_title, top_n=5):
     recommendations = df.iloc[top_indices][['title', 'authors']]
     return recommendations
 
+# Function to recommend books from a reading history (several liked titles)
+# - ratings: optional star rating per title, used to weight its influence
+# The whole history is scored in one pass and every book sharing a title with
+# the history is left out (books.csv repeats some titles)
+def recommend_from_history(book_titles, ratings=None, top_n=5):
+    book_titles = list(book_titles)
+    if ratings is not None and len(ratings) != len(book_titles):
+        raise ValueError(f"Got {len(ratings)} ratings for {len(book_titles)} titles")
+
+    df = load_profiles()
+    with open("vectorizer.pkl", "rb") as f:
+        vectorizer = pickle.load(f)
+    tfidf_matrix = load_tfidf_matrix(vectorizer)
+
+    # Keep the titles we know (first match per title), along with their ratings
+    title_rows = {}
+    for i, title in enumerate(df['title']):
+        title_rows.setdefault(title, i)
+    ratings = [1.0] * len(book_titles) if ratings is None else list(ratings)
+    known = [(title_rows[t], r) for t, r in zip(book_titles, ratings) if t in title_rows]
+    if not known:
+        print("❌ None of the given titles were found in book list.")
+        return []
+
+    seed_rows = [row for row, _ in known]
+    query = history_query(tfidf_matrix, seed_rows, [r for _, r in known])
+    exclude = df.index[df['title'].isin(book_titles)]
+    indices, _ = top_n_similar(query, tfidf_matrix, top_n, exclude=[exclude])[0]
+    return df.iloc[indices][['title', 'authors']]
+
 # Run model training if script is executed directly
+# - python model.py                  → in-memory training (model.pkl + vectorizer.pkl)
+# - python model.py --out-of-core    → chunked training into the on-disk TF-IDF store
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the BookTeria recommendation model.")
+    parser.add_argument("--out-of-core", action="store_true", help="stream profiles in chunks and write TF-IDF rows to disk")
+    parser.add_argument("--chunksize", type=int, default=5000, help="profiles per chunk in out-of-core mode")
+    parser.add_argument("--store", default=TFIDF_STORE, help="directory for the on-disk TF-IDF store")
+    parser.add_argument("--verify", action="store_true", help="compare the store with the in-memory vectors")
+    args = parser.parse_args()
+
+    if args.out_of_core:
+        train_model_out_of_core(args.chunksize, args.store)
+        if args.verify:
+            print("✅ Matches in-memory TF-IDF" if verify_tfidf_store(args.store) else "❌ Differs from in-memory TF-IDF")
+    else:
+        train_model()
@@ -0,0 +1,99 @@
+# title_index.py — Prefix Index for Book Titles
+# ===========================
+# This module builds a sorted-array index over book titles once per catalog.
+# The "Select a Book" form uses it for server-side typeahead: only the top
+# matches for the typed prefix (ranked by popularity) are sent to the browser.
+
+import bisect
+import heapq
+import sys
+
+# Sentinel that sorts after every real character, used to find the end of a prefix range
+PREFIX_END = "\U0010ffff"
+
+class TitleIndex:
+    # Build the index from parallel sequences of titles and popularity scores
+    # - Titles are matched case-insensitively on their leading characters
+    # - Duplicate titles keep their highest popularity
+    # - Top matches are precomputed for every prefix that matches more than
+    #   `scan_limit` titles; any other prefix is ranked by scanning at most
+    #   `scan_limit` entries, so lookups stay flat as the catalog grows
+    def __init__(self, titles, popularity, top_k=10, scan_limit=64):
+        best = {}
+        for title, score in zip(titles, popularity):
+            if not isinstance(title, str) or not title.strip():
+                continue
+            score = float(score) if score == score else 0.0
+            if title not in best or score > best[title]:
+                best[title] = score
+
+        entries = sorted((title.lower(), title, score) for title, score in best.items())
+        self.keys = [key for key, _, _ in entries]
+        self.titles = [title for _, title, _ in entries]
+        self.popularity = [score for _, _, score in entries]
+        self.top_k = top_k
+        self.scan_limit = scan_limit
+
+        # Walk the implicit trie over the sorted keys, caching every heavy prefix
+        # Each entry is (prefix, lo, hi) with keys[lo:hi] starting with prefix
+        self._cache = {}
+        stack = [("", 0, len(self.keys))]
+        while stack:
+            prefix, lo, hi = stack.pop()
+            if hi - lo <= scan_limit:
+                continue
+            self._cache[prefix] = self._rank(range(lo, hi), top_k)
+
+            # Keys equal to the prefix sort first; split the rest by their next character
+            depth = len(prefix)
+            i = lo
+            while i < hi and len(self.keys[i]) == depth:
+                i += 1
+            while i < hi:
+                child = self.keys[i][:depth + 1]
+                j = bisect.bisect_left(self.keys, child + PREFIX_END, i, hi)
+                stack.append((child, i, j))
+                i = j
+
+    def __len__(self):
+        return len(self.titles)
+
+    # Approximate memory held by the index, in bytes
+    # Counts the key, title and popularity lists with their items, and the prefix cache
+    def nbytes(self):
+        parts = (self.keys, self.titles, self.popularity)
+        total = sum(sys.getsizeof(part) for part in parts) + sys.getsizeof(self._cache)
+        total += sum(sys.getsizeof(item) for part in parts for item in part)
+        for prefix, positions in self._cache.items():
+            total += sys.getsizeof(prefix) + sys.getsizeof(positions)
+            total += sum(sys.getsizeof(i) for i in positions)
+        return total
+
+    # Return the [lo, hi) slice of sorted keys that start with `prefix`
+    def _range(self, prefix):
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + PREFIX_END, lo)
+        return lo, hi
+
+    # Pick the `limit` most popular positions, ties broken alphabetically
+    def _rank(self, positions, limit):
+        return heapq.nsmallest(limit, positions, key=lambda i: (-self.popularity[i], i))
+
+    # Return up to `limit` titles starting with `prefix`, most popular first
+    # An empty prefix returns the most popular titles in the whole catalog
+    def search(self, prefix, limit=None):
+        limit = self.top_k if limit is None else limit
+        # Only leading spaces are dropped: a typed trailing space marks a word boundary
+        prefix = (prefix or "").lstrip().lower()
+
+        if limit <= self.top_k and prefix in self._cache:
+            positions = self._cache[prefix][:limit]
+        else:
+            lo, hi = self._range(prefix)
+            positions = self._rank(range(lo, hi), limit)
+        return [self.titles[i] for i in positions]
+
+# Build the index from a DataFrame with 'title' and a popularity column
+def build_title_index(df, popularity_col='ratings_count', top_k=10):
+    popularity = df[popularity_col].fillna(0) if popularity_col in df else [0] * len(df)
+    return TitleIndex(df['title'], popularity, top_k=top_k)